@@ -0,0 +1,35 @@
+import os
+import time
+
+import pytest
+
+
+TIMEZONES = [
+    'UTC',
+    'America/Los_Angeles',
+    'America/St_Johns',
+    'Europe/London',
+    'Asia/Kolkata',
+    'Australia/Lord_Howe',
+]
+
+
+@pytest.fixture(params=TIMEZONES)
+def local_timezone(request):
+    """
+    Set the process-local timezone for the duration of a test.
+    """
+    if not hasattr(time, 'tzset'):
+        pytest.skip('time.tzset is not available on this platform')
+    
+    original = os.environ.get('TZ')
+    os.environ['TZ'] = request.param
+    time.tzset()
+    
+    yield request.param
+    
+    if original is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = original
+    time.tzset()
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from timesignal.models import EventOrchestra, EventSignal
+
+
+# Local wall times at or near DST transitions (gaps and folds) in the tested timezones
+TRANSITION_WALL_TIMES = [
+    datetime(2021, 3, 14, 2, 30),   # America gap
+    datetime(2021, 11, 7, 1, 30),   # America fold
+    datetime(2021, 3, 28, 1, 30),   # Europe/London gap
+    datetime(2021, 10, 31, 1, 30),  # Europe/London fold
+    datetime(2021, 4, 4, 1, 45),    # Australia/Lord_Howe fold (30 minutes)
+    datetime(2021, 10, 3, 2, 15),   # Australia/Lord_Howe gap (30 minutes)
+]
+
+
+def wall_time_sweep():
+    """
+    Wall times every 7 minutes 13.5 seconds within three hours of each transition; dense enough for the bulk path.
+    """
+    step = timedelta(minutes=7, seconds=13, microseconds=500000)
+    return [
+        wall + k * step
+        for wall in TRANSITION_WALL_TIMES
+        for k in range(-25, 26)
+    ]
+
+
+def test_encode_datetimes_datetime64_matches_timestamp(local_timezone):
+    dts = sorted(wall_time_sweep() + TRANSITION_WALL_TIMES)
+    rng = np.random.default_rng(0)
+    dts += [datetime(2021, 1, 1) + timedelta(microseconds=int(us)) for us in rng.integers(0, 400 * 86400 * 10 ** 6, 2000)]
+    
+    encoded = EventSignal.encode_datetimes(np.array(dts, dtype='datetime64[us]'))
+    
+    assert encoded.tolist() == [dt.timestamp() for dt in dts]
+
+
+def test_encode_datetimes_datetime64_sparse_and_edge_cases(local_timezone):
+    sparse = [datetime(1970, 1, 2), datetime(2021, 11, 7, 1, 30), datetime(2050, 6, 1)]
+    near_max = [datetime(9999, 12, 31, 12, 0, second) for second in range(50)]
+    
+    for dts in (sparse, near_max):
+        encoded = EventSignal.encode_datetimes(np.array(dts, dtype='datetime64[us]'))
+        assert encoded.tolist() == [dt.timestamp() for dt in dts]
+    
+    assert EventSignal.encode_datetimes(np.array([], dtype='datetime64[us]')).shape == (0,)
+
+
+def test_orchestra_datetime64_lookup_matches_datetimes(local_timezone):
+    t0 = datetime(2021, 11, 7)
+    signal = EventSignal(values=[(t0 + timedelta(minutes=i), float(i)) for i in range(240)])
+    orchestra = EventOrchestra({'s': signal})
+    dts = [t0 + timedelta(minutes=i, seconds=30) for i in range(0, 239, 3)]
+    
+    from_datetime64 = orchestra[np.array(dts, dtype='datetime64[us]')]['s']
+    from_datetimes = orchestra[dts]['s']
+    
+    np.testing.assert_array_equal(from_datetime64, from_datetimes)
+
+
+def decoded_matches_fromtimestamp(timestamps):
+    """
+    Check decode_datetimes against datetime.fromtimestamp, including the fold attribute.
+    """
+    decoded = EventSignal.decode_datetimes(np.asarray(timestamps, dtype=np.float64))
+    expected = [datetime.fromtimestamp(ts) for ts in timestamps]
+    return [(dt, dt.fold) for dt in decoded] == [(dt, dt.fold) for dt in expected]
+
+
+def test_decode_datetimes_matches_fromtimestamp(local_timezone):
+    # Instants every 37.123457 seconds within three hours of each transition, covering both sides of every fold
+    instants = sorted({
+        dt.timestamp() + k * 37.123457
+        for wall in TRANSITION_WALL_TIMES
+        for dt in (wall, wall.replace(fold=1))
+        for k in range(-300, 301)
+    })
+    assert decoded_matches_fromtimestamp(instants)
+    
+    rng = np.random.default_rng(0)
+    start = datetime(2021, 1, 1).timestamp()
+    assert decoded_matches_fromtimestamp(np.sort(start + rng.uniform(0, 400 * 86400, 20000)).tolist())
+
+
+def test_decode_datetimes_sparse_and_edge_cases(local_timezone):
+    assert decoded_matches_fromtimestamp([0.0, 86400.5, 1636273800.25, 2.5e9])
+    assert decoded_matches_fromtimestamp([datetime(9999, 12, 30, 12).timestamp() + 60.5 * i for i in range(50)])
+    assert decoded_matches_fromtimestamp([])
+
+
+def test_values_round_trip(local_timezone):
+    t0 = datetime(2021, 11, 7, 1, 30)
+    dts = [t0 + timedelta(seconds=45 * i) for i in range(-100, 100)]
+    signal = EventSignal(values=[(dt, float(i)) for i, dt in enumerate(dts)])
+    
+    assert [dt for dt, _ in signal.values] == sorted(datetime.fromtimestamp(dt.timestamp()) for dt in dts)
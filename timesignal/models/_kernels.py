@@ -0,0 +1,133 @@
+"""
+Optional Numba-compiled interpolation kernels. Each kernel is None if Numba is not installed.
+"""
+import numpy as np
+
+# Largest signals served by the size-specialized linear kernels
+SCAN_MAX_SAMPLES = 8
+BISECT_MAX_SAMPLES = 1024
+
+try:
+    from numba import njit
+except ImportError:  # Numba is an optional dependency
+    njit = None
+
+# Only flags that keep NaN and Inf semantics; values may legitimately hold either
+_FASTMATH = {'nsz', 'contract'}
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=_FASTMATH)
+    def linear_interp(ts, times, values, out):
+        """
+        Linearly interpolate (times, values) at ts into out. Clamps to the end values, like np.interp.
+        """
+        n = times.shape[0]
+        for k in range(ts.shape[0]):
+            t = ts[k]
+            if t < times[0]:
+                out[k] = values[0]
+            elif t >= times[n - 1]:
+                out[k] = values[n - 1]
+            else:
+                i = np.searchsorted(times, t, side='right')  # times[i - 1] <= t < times[i]
+                t0 = times[i - 1]
+                v0 = values[i - 1]
+                if t == t0:  # Exact sample hit (the last, if duplicated); blending would spread NaN or Inf
+                    out[k] = v0
+                else:
+                    out[k] = v0 + (values[i] - v0) * (t - t0) / (times[i] - t0)
+        return out
+    
+    @njit(cache=True, fastmath=_FASTMATH)
+    def linear_interp_scan(ts, times, values, out):
+        """
+        Linearly interpolate (times, values) at ts into out, locating each point by linear scan. For small signals.
+        """
+        n = times.shape[0]
+        for k in range(ts.shape[0]):
+            t = ts[k]
+            if t < times[0]:
+                out[k] = values[0]
+            elif t >= times[n - 1]:
+                out[k] = values[n - 1]
+            else:
+                i = 1
+                while times[i] <= t:  # Advance until times[i - 1] <= t < times[i]
+                    i += 1
+                t0 = times[i - 1]
+                v0 = values[i - 1]
+                if t == t0:  # Exact sample hit (the last, if duplicated); blending would spread NaN or Inf
+                    out[k] = v0
+                else:
+                    out[k] = v0 + (values[i] - v0) * (t - t0) / (times[i] - t0)
+        return out
+    
+    @njit(cache=True, fastmath=_FASTMATH)
+    def linear_interp_bisect(ts, times, values, out):
+        """
+        Linearly interpolate (times, values) at ts into out, locating each point by branchless bisection.
+        Every lookup takes the same ceil(log2(N)) steps. For moderately sized signals.
+        """
+        n = times.shape[0]
+        for k in range(ts.shape[0]):
+            t = ts[k]
+            if t < times[0]:
+                out[k] = values[0]
+            elif t >= times[n - 1]:
+                out[k] = values[n - 1]
+            else:
+                # Find the last index with times[base] <= t
+                base = 0
+                size = n
+                while size > 1:
+                    half = size >> 1
+                    base += half * (times[base + half] <= t)
+                    size -= half
+                t0 = times[base]
+                v0 = values[base]
+                if t == t0:  # Exact sample hit (the last, if duplicated); blending would spread NaN or Inf
+                    out[k] = v0
+                else:
+                    out[k] = v0 + (values[base + 1] - v0) * (t - t0) / (times[base + 1] - t0)
+        return out
+    
+    @njit(cache=True, fastmath=_FASTMATH)
+    def linear_interp_sorted(ts, times, values, out):
+        """
+        Linearly interpolate (times, values) at ascending ts into out, walking a cursor instead of bisecting.
+        """
+        n = times.shape[0]
+        i = 1
+        for k in range(ts.shape[0]):
+            t = ts[k]
+            if t < times[0]:
+                out[k] = values[0]
+            elif t >= times[n - 1]:
+                out[k] = values[n - 1]
+            else:
+                while times[i] <= t:  # Advance until times[i - 1] <= t < times[i]
+                    i += 1
+                t0 = times[i - 1]
+                v0 = values[i - 1]
+                if t == t0:  # Exact sample hit (the last, if duplicated); blending would spread NaN or Inf
+                    out[k] = v0
+                else:
+                    out[k] = v0 + (values[i] - v0) * (t - t0) / (times[i] - t0)
+        return out
+else:
+    linear_interp = None
+    linear_interp_scan = None
+    linear_interp_bisect = None
+    linear_interp_sorted = None
+
+
+def select_linear_kernel(n: int):
+    """
+    Select the linear interpolation kernel specialized for a signal of n samples, or None if Numba is not installed.
+    """
+    if n <= SCAN_MAX_SAMPLES:
+        return linear_interp_scan
+    if n <= BISECT_MAX_SAMPLES:
+        return linear_interp_bisect
+    return linear_interp
@@ -1,5 +1,9 @@
+import weakref
 from datetime import datetime
-from typing import Dict, Iterable, Tuple, Union
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
 
 from timesignal.models.signal import EventSignal
 
@@ -7,24 +11,129 @@ from timesignal.models.signal import EventSignal
 class EventOrchestra:
     """
     Collection of named event signals. Provides a unified interface for interpolation. Event orchestras are recursively-composable.
+    
+    The set of elements is fixed at construction. Elements may still change (e.g. by setting a signal's values); the
+    orchestra is then marked dirty, and its bounds, flattened leaves, and cached results are recomputed on next use.
+    An orchestra with no elements (or only empty signals) has no bounds and holds no values.
+    
+    Results of get_dict_at_datetime are kept in an LRU cache of cache_size entries. If quantum_seconds is given, datetimes
+    within the orchestra's bounds are bucketed into intervals of that many seconds and each bucket is evaluated once, at
+    its start (clamped to the orchestra's bounds); otherwise the cache is keyed on the exact timestamp.
     """
     
-    def __init__(self, elements: Dict[str, Union[EventSignal, 'EventOrchestra']]):
-        self._elements = elements
+    __slots__ = (
+        '_elements', '_start', '_end', '_t_start', '_t_end',
+        '_leaves', '_leaf_t_starts', '_leaf_t_ends',
+        '_quantum_seconds', '_get_cached_pairs',
+        '_dirty', '_orchestras', '__weakref__',
+    )
+    
+    def __init__(self, elements: Dict[str, Union[EventSignal, 'EventOrchestra']], cache_size: int = 128, quantum_seconds: Optional[float] = None):
+        if quantum_seconds is not None and not quantum_seconds > 0:
+            raise ValueError(f'Quantum {quantum_seconds} must be a positive number of seconds.')
+        
+        self._elements = dict(elements)
+        
+        # Event orchestras containing this one; register with the elements to be notified when they change
+        self._orchestras = weakref.WeakSet()
+        for element in self._elements.values():
+            element._orchestras.add(self)
+        
+        # LRU cache of (path, value) pairs, keyed by (quantized) timestamp
+        self._quantum_seconds = quantum_seconds
+        self._get_cached_pairs = lru_cache(maxsize=cache_size)(self._get_pairs_at_key)
+        
+        self._update()
+    
+    def __getstate__(self):
+        # The LRU cache and weak references do not pickle; rebuild them on unpickling
+        return {
+            'elements': self._elements,
+            'cache_size': self._get_cached_pairs.cache_info().maxsize,
+            'quantum_seconds': self._quantum_seconds,
+        }
+    
+    def __setstate__(self, state):
+        self.__init__(state['elements'], cache_size=state['cache_size'], quantum_seconds=state['quantum_seconds'])
+    
+    def _update(self):
+        """
+        Compute the bounds and flattened leaves of the orchestra from its elements, and clear the cache.
+        """
+        # Bounds of the orchestra; empty elements have none. Encoded bounds of an empty orchestra contain nothing.
+        starts = [element.start for element in self._elements.values() if element.start is not None]
+        ends = [element.end for element in self._elements.values() if element.end is not None]
+        self._start = min(starts) if starts else None
+        self._end = max(ends) if ends else None
+        self._t_start = EventSignal.encode_datetime(self._start) if starts else np.inf
+        self._t_end = EventSignal.encode_datetime(self._end) if ends else -np.inf
+        
+        # Flattened (path, signal) leaves in depth-first order, with their encoded bounds
+        self._leaves = []
+        for name, element in self._elements.items():
+            if isinstance(element, EventOrchestra):
+                self._leaves.extend(((name,) + path, signal) for path, signal in element._leaves)
+            else:
+                self._leaves.append(((name,), element))
+        self._leaf_t_starts = np.array([np.inf if signal._t_start is None else signal._t_start for _, signal in self._leaves], dtype=np.float64)
+        self._leaf_t_ends = np.array([-np.inf if signal._t_end is None else signal._t_end for _, signal in self._leaves], dtype=np.float64)
+        
+        self._get_cached_pairs.cache_clear()
+        self._dirty = False
+    
+    def _refresh(self):
+        """
+        Recompute the cached state of the orchestra if any element has changed.
+        Dirty nested orchestras are collected iteratively and updated bottom-up, before the orchestras containing them.
+        """
+        if not self._dirty:
+            return
+        
+        # A clean orchestra has only clean descendants, so only dirty children need visiting
+        visited = []
+        stack = [self]
+        while stack:
+            orchestra = stack.pop()
+            visited.append(orchestra)
+            stack.extend(
+                element for element in orchestra._elements.values()
+                if isinstance(element, EventOrchestra) and element._dirty
+            )
+        
+        for orchestra in reversed(visited):
+            if orchestra._dirty:  # An orchestra nested in several places is visited more than once
+                orchestra._update()
+    
+    def _invalidate(self):
+        """
+        Mark the orchestra and all event orchestras containing it, walked iteratively, as dirty.
+        """
+        stack = [self]
+        while stack:
+            orchestra = stack.pop()
+            if orchestra._dirty:  # Containing orchestras are already dirty
+                continue
+            
+            orchestra._dirty = True
+            stack.extend(orchestra._orchestras)
 
     @property
     def start(self) -> datetime:
-        return min(element.start for element in self._elements.values())
+        self._refresh()
+        return self._start
     
     @property
     def end(self) -> datetime:
-        return max(element.end for element in self._elements.values())
+        self._refresh()
+        return self._end
     
     def _check_time_index(self, time_index: datetime):
         """
         Check if the given time index is within the bounds of the signal orchestra.
         """
-        if time_index < self.start or time_index > self.end:
+        self._refresh()
+        ts = EventSignal.encode_datetime(time_index)
+        if not self._t_start <= ts <= self._t_end:
             raise ValueError(f'Time index {time_index} is out of bounds.')
 
     def get_signal(self, name: str) -> Union[EventSignal, 'EventOrchestra']:
@@ -38,28 +147,142 @@ class EventOrchestra:
     
     def get_name_value_pairs_at_datetime(self, time_index: datetime) -> Iterable[Tuple[str, Union[float, 'EventOrchestra']]]:
         """
-        Get name-value pairs of all valid elements at a given datetime.
+        Get name-value pairs of all valid elements at a given datetime. Nested event orchestras are evaluated from the
+        same flattened leaves as get_dict_at_datetime, bypassing their own caches.
         """
-        for name, signal in self._elements.items():
-            try:
-                value = signal[time_index]
-                if value is not None:
-                    yield name, value
-            except ValueError:
-                pass
+        self._refresh()
+        ts = EventSignal.encode_datetime(time_index)
+        yield from self._build_dict(self._compute_pairs_at_timestamp(ts)).items()
 
     def get_dict_at_datetime(self, time_index: datetime, include_empty: bool = False) -> Dict[str, Union[float, dict]]:
         """
         Get a dictionary of all valid event signal values at a given datetime.
-        Recursively calls get_dict_at_datetime on all nested event orchestras.
+        Results are cached; each call returns a new dictionary.
         """
-        d = dict(self.get_name_value_pairs_at_datetime(time_index))
+        self._refresh()
+        ts = EventSignal.encode_datetime(time_index)
+        if not self._t_start <= ts <= self._t_end:  # Outside the orchestra; its bucket must not be clamped onto it
+            return {} if include_empty else None
+        
+        key = ts if self._quantum_seconds is None else int(ts // self._quantum_seconds)
+        d = self._build_dict(self._get_cached_pairs(key))
         
         if d or include_empty:
             return d
+    
+    def cache_clear(self):
+        """
+        Clear the cache of get_dict_at_datetime results.
+        """
+        self._get_cached_pairs.cache_clear()
+    
+    def _get_pairs_at_key(self, key: Union[float, int]) -> Tuple[Tuple[Tuple[str, ...], float], ...]:
+        """
+        Compute the (path, value) pairs for a cache key: an exact timestamp, or a bucket index if quantized.
+        """
+        if self._quantum_seconds is None:
+            ts = key
+        else:  # Evaluate at the start of the bucket, kept within the orchestra
+            ts = min(max(key * self._quantum_seconds, self._t_start), self._t_end)
+        
+        return self._compute_pairs_at_timestamp(ts)
+    
+    def _compute_pairs_at_timestamp(self, ts: float) -> Tuple[Tuple[Tuple[str, ...], float], ...]:
+        """
+        Compute the (path, value) pairs of all valid event signals at an encoded timestamp, in depth-first order.
+        """
+        if not self._t_start <= ts <= self._t_end:  # No leaf can overlap
+            return ()
+        
+        in_bounds = (self._leaf_t_starts <= ts) & (ts <= self._leaf_t_ends)
+        return tuple(
+            (self._leaves[i][0], self._leaves[i][1]._interpolate_fast(ts))
+            for i in np.flatnonzero(in_bounds).tolist()
+        )
+    
+    @staticmethod
+    def _build_dict(pairs: Iterable[Tuple[Tuple[str, ...], float]]) -> Dict[str, Union[float, dict]]:
+        """
+        Build a nested dictionary from (path, value) pairs. Nested orchestras with no valid values are omitted.
+        """
+        d = {}
+        for path, value in pairs:
+            EventOrchestra._insert_at_path(d, path, value)
+        return d
+    
+    @staticmethod
+    def _insert_at_path(d: dict, path: Tuple[str, ...], value: float):
+        """
+        Insert a value into a nested dictionary at the given path, creating intermediate dictionaries as needed.
+        """
+        for name in path[:-1]:
+            d = d.setdefault(name, {})
+        d[path[-1]] = value
+
+    def get_values_at_datetimes(self, time_indices: Iterable[datetime]) -> Dict[str, Union[np.ndarray, dict]]:
+        """
+        Get a dictionary of event signal value arrays at the given datetimes.
+        Values at datetimes outside the bounds of a signal are NaN. Nested event orchestras map to nested dictionaries.
+        See get_columns_at_datetimes for the same arrays keyed by path, and get_dict_at_datetimes for one dictionary per datetime.
+        """
+        d = {}
+        for path, values in self.get_columns_at_datetimes(time_indices).items():
+            self._insert_at_path(d, path, values)
+        return d
+    
+    def get_columns_at_datetimes(self, time_indices: Iterable[datetime]) -> Dict[Tuple[str, ...], np.ndarray]:
+        """
+        Get columnar event signal values at the given datetimes, as a dictionary mapping each signal's path to an array.
+        Values at datetimes outside the bounds of a signal are NaN. See get_values_at_datetimes for the nested form.
+        """
+        self._refresh()
+        timestamps = EventSignal.encode_datetimes(time_indices)
+        
+        columns = np.full((len(self._leaves), len(timestamps)), np.nan)
+        in_bounds = (self._leaf_t_starts[:, None] <= timestamps) & (timestamps <= self._leaf_t_ends[:, None])
+        for i, (_, signal) in enumerate(self._leaves):
+            mask = in_bounds[i]
+            if mask.any():
+                columns[i, mask] = signal._interpolate(timestamps[mask])
+        
+        return {path: columns[i] for i, (path, _) in enumerate(self._leaves)}
+
+    def get_dict_at_datetimes(self, time_indices: Iterable[datetime], include_empty: bool = False) -> List[Optional[Dict[str, Union[float, dict]]]]:
+        """
+        Get a dictionary of all valid event signal values at each of the given datetimes, as by get_dict_at_datetime.
+        The datetimes are sorted once so that each signal is interpolated over an ascending batch.
+        For arrays of values per signal instead, see get_values_at_datetimes and get_columns_at_datetimes.
+        """
+        self._refresh()
+        timestamps = EventSignal.encode_datetimes(time_indices)
+        order = np.argsort(timestamps, kind='stable')
+        sorted_timestamps = timestamps[order]
+        
+        # Interpolate each leaf over the slice of sorted timestamps within its bounds
+        columns = []
+        los = np.searchsorted(sorted_timestamps, self._leaf_t_starts, side='left').tolist()
+        his = np.searchsorted(sorted_timestamps, self._leaf_t_ends, side='right').tolist()
+        for (path, signal), lo, hi in zip(self._leaves, los, his):
+            values = signal._interpolate_sorted(sorted_timestamps[lo:hi]).tolist() if lo < hi else []
+            columns.append((path, lo, hi, values))
+        
+        # Assemble in sorted order, then place each dictionary back at its original position
+        dicts = [None] * len(timestamps)
+        for k, position in enumerate(order.tolist()):
+            d = {}
+            for path, lo, hi, values in columns:
+                if lo <= k < hi:
+                    self._insert_at_path(d, path, values[k - lo])
+            
+            if d or include_empty:
+                dicts[position] = d
+        
+        return dicts
 
-    def __getitem__(self, time_index: datetime):
-        return self.get_dict_at_datetime(time_index)
+    def __getitem__(self, time_index: Union[datetime, Iterable[datetime]]):
+        if isinstance(time_index, datetime):
+            return self.get_dict_at_datetime(time_index)
+        return self.get_values_at_datetimes(time_index)
 
 
 
@@ -1,22 +1,115 @@
-from datetime import datetime, timedelta
-from typing import Iterable
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Tuple, Union
 
 import numpy as np
 from scipy import interpolate
 
+from timesignal.models import _kernels
+
+
+_SECONDS_PER_DAY = 86400.0
+
+# Supported value dtypes: floating, since out-of-bounds values are NaN, and supported by np.interp and the kernels
+_VALUE_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+
+def _utc_offset(ts: float) -> float:
+    """
+    Get the local UTC offset in seconds at an encoded timestamp.
+    """
+    return (datetime.fromtimestamp(ts) - datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)).total_seconds()
+
+
+def _decode_each(ts: np.ndarray) -> np.ndarray:
+    """
+    Decode a float64 array into an object array of datetimes, one timestamp at a time.
+    """
+    dts = np.empty(ts.shape, dtype=object)
+    dts[:] = [datetime.fromtimestamp(t) for t in ts.tolist()]
+    return dts
+
+
+def _encode_datetime64(dts: np.ndarray) -> np.ndarray:
+    """
+    Encode a datetime64 array of local times into a float64 array, as by datetime.timestamp.
+    """
+    micros = dts.astype('datetime64[us]').view(np.int64).ravel()
+    wall_days = micros // 1000000 // int(_SECONDS_PER_DAY)
+    
+    # The instant of a local time lies within a day of it. If the offset is constant from two days before to three
+    # days after its day (offsets change at most once a day), it is unique and a single subtraction away.
+    window = np.arange(-2, 4)
+    days = np.unique(np.unique(wall_days)[:, None] + window)
+    
+    # Each day bound costs two conversions; encode sparse samples individually instead
+    if 2 * len(days) >= micros.size:
+        return _encode_each(dts)
+    
+    try:
+        day_offsets = np.array([_utc_offset(day * _SECONDS_PER_DAY) for day in days.tolist()])
+    except (OverflowError, OSError, ValueError):
+        return _encode_each(dts)
+    
+    # The window days are consecutive in days, so offset the index of each sample's day
+    offsets = day_offsets[np.searchsorted(days, wall_days)[:, None] + window]
+    ts = (micros // 1000000 - offsets[:, 0].astype(np.int64)) + (micros % 1000000) / 1e6
+    
+    # Encode individually where the offset changes nearby (including gaps and folds)
+    varying = np.flatnonzero(np.any(offsets != offsets[:, :1], axis=1))
+    if varying.size:
+        ts[varying] = _encode_each(dts.ravel()[varying])
+    
+    return ts.reshape(dts.shape)
+
+
+def _encode_each(dts: np.ndarray) -> np.ndarray:
+    """
+    Encode a datetime64 array of local times into a float64 array, one datetime at a time.
+    """
+    return np.fromiter((dt.timestamp() for dt in dts.astype('datetime64[us]').ravel().tolist()), dtype=np.float64).reshape(dts.shape)
+
 
 class EventSignal:
     """
     Interpolable scalar-valued signal of discrete events.
+    
+    Values are stored as value_dtype, either np.float32 or np.float64. Storing them as np.float32 halves their memory footprint and bandwidth at the cost
+    of precision (about 7 significant digits); timestamps are always stored as float64.
+    
+    Setting values or interpolation invalidates the cached state of each event orchestra containing the signal.
     """
     
-    def __init__(self, values=None, interpolation='linear'):
-        # Internal data array; 2xN, where N is the number of samples
-        self._data = None
+    __slots__ = (
+        '_times', '_values', '_value_dtype',
+        '_start_dt', '_end_dt', '_t_start', '_t_end',
+        '_interpolation', '_interpolate', '_interpolate_sorted',
+        '_orchestras', '__weakref__',
+    )
+    
+    def __init__(self, values=None, interpolation='linear', value_dtype=np.float64):
+        # Internal data arrays; sorted encoded timestamps and their values, each of length N
+        self._times = None
+        self._values = None
+        self._value_dtype = np.dtype(value_dtype)
+        if self._value_dtype not in _VALUE_DTYPES:
+            raise ValueError(f'Value dtype {self._value_dtype} is not supported; use float32 or float64.')
+        
+        # Cached datetime bounds of the signal
+        self._start_dt = None
+        self._end_dt = None
+        
+        # Cached encoded bounds of the signal
+        self._t_start = None
+        self._t_end = None
         
         # Interpolation kind / function
         self._interpolation = interpolation
         self._interpolate = None
+        self._interpolate_sorted = None
+        
+        # Event orchestras containing this signal, notified when it changes
+        self._orchestras = weakref.WeakSet()
         
         if values is not None:  # Seed the signal with given values
             self.values = values
@@ -28,48 +121,166 @@ class EventSignal:
     @interpolation.setter
     def interpolation(self, value):
         self._interpolation = value
+        self._invalidate_orchestras()
+        
+        if self._times is None:
+            return
         
-        if self._data is not None:
+        times, values = self._times, self._values
+        kernel = _kernels.select_linear_kernel(len(times)) if value == 'linear' else None
+        if kernel is not None:
+            self._interpolate = self._make_kernel_interpolate(kernel, times, values)
+        elif value == 'linear':
+            # np.interp clamps rather than raising; bounds are checked by the callers
+            self._interpolate = lambda ts: np.interp(ts, times, values).astype(values.dtype, copy=False)
+        elif value == 'cubic':
+            self._interpolate = interpolate.CubicSpline(times, values)
+        else:
             self._interpolate = interpolate.interp1d(
-                self._data[0, :], 
-                self._data[1, :], 
+                times, 
+                values, 
                 kind=value, 
                 copy=False, 
                 bounds_error=True, 
                 assume_sorted=True
             )
+        
+        # Interpolation function for ascending timestamps
+        if value == 'linear' and _kernels.linear_interp_sorted is not None:
+            self._interpolate_sorted = self._make_kernel_interpolate(_kernels.linear_interp_sorted, times, values)
+        else:
+            self._interpolate_sorted = self._interpolate
+    
+    def __getstate__(self):
+        # Interpolation functions may be closures, which do not pickle; they are rebuilt on unpickling
+        # Containing orchestras re-register themselves when they are unpickled
+        excluded = ('_interpolate', '_interpolate_sorted', '_orchestras', '__weakref__')
+        return {name: getattr(self, name) for name in self.__slots__ if name not in excluded}
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        
+        self._orchestras = weakref.WeakSet()
+        self._interpolate = None
+        self._interpolate_sorted = None
+        self.interpolation = self._interpolation
+    
+    def _invalidate_orchestras(self):
+        """
+        Invalidate the cached state of all event orchestras containing the signal.
+        """
+        for orchestra in self._orchestras:
+            orchestra._invalidate()
+    
+    @staticmethod
+    def _make_kernel_interpolate(kernel, times: np.ndarray, values: np.ndarray):
+        """
+        Wrap a compiled interpolation kernel as a function of a timestamp or array of timestamps.
+        """
+        def _interpolate(ts):
+            ts = np.asarray(ts, dtype=np.float64)
+            out = np.empty(ts.shape, dtype=values.dtype)
+            kernel(ts.reshape(-1), times, values, out.reshape(-1))
+            return out
+        
+        return _interpolate
     
     def __len__(self):
-        return self._data.shape[1]
+        return len(self._times)
     
     def __getitem__(self, time_index: datetime):
         return self.get_value_at_datetime(time_index)
     
-    def _check_time_index(self, time_index: datetime):
+    def _check_time_index(self, time_index: Union[datetime, float]):
         """
-        Check if the given time index is within the bounds of the signal.
+        Check if the given time index is within the bounds of the signal. Accepts a datetime or an encoded timestamp.
         """
-        if time_index < self.start or time_index > self.end:
+        ts = self.encode_datetime(time_index) if isinstance(time_index, datetime) else time_index
+        if ts < self._t_start or ts > self._t_end:
             raise ValueError(f'Time index {time_index} is out of bounds.')
     
     def get_value_at_datetime(self, time_index: datetime):
         """
         Get the value of the signal at a given datetime.
         """
-        self._check_time_index(time_index)
-        return self.interpolate_datetimes((time_index,)).item()
+        ts = self.encode_datetime(time_index)
+        self._check_time_index(ts)
+        return self._interpolate_fast(ts)
+    
+    def _interpolate_fast(self, ts: float) -> float:
+        """
+        Get the interpolated value of the signal at an encoded timestamp. Does not check bounds.
+        """
+        if self._interpolation == 'linear':
+            return self._interp_scalar(ts)
+        
+        return self._interpolate(ts).item()
+    
+    def _interp_scalar(self, ts: float) -> float:
+        """
+        Linearly interpolate the signal at an in-bounds encoded timestamp without allocating an array.
+        """
+        if ts >= self._t_end:
+            return float(self._values[-1])
+        
+        # times[i - 1] <= ts < times[i]; at duplicated timestamps, the last sample wins, as in np.interp
+        i = int(np.searchsorted(self._times, ts, side='right'))
+        t0 = float(self._times[i - 1])
+        v0 = float(self._values[i - 1])
+        if t0 == ts:
+            return v0
+        
+        t1 = float(self._times[i])
+        v1 = float(self._values[i])
+        return v0 + (v1 - v0) * (ts - t0) / (t1 - t0)
     
     def get_value_at_index(self, index: int):
         """
         Get the value of the signal at a given index.
         """
-        return self._data[1, index]
+        return self._values[index]
     
     def interpolate_datetimes(self, time_indices: Iterable[datetime]) -> np.ndarray:
         """
         Get the interpolated values of the signal at the given datetimes.
+        Datetimes outside the bounds of the signal are assigned NaN.
+        """
+        return self.interpolate_timestamps(self.encode_datetimes(time_indices))
+    
+    def interpolate_timestamps(self, timestamps: np.ndarray) -> np.ndarray:
+        """
+        Get the interpolated values of the signal at the given encoded timestamps.
+        Timestamps outside the bounds of the signal are assigned NaN.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.full(timestamps.shape, np.nan, dtype=self._value_dtype)
+        
+        in_bounds = (timestamps >= self._t_start) & (timestamps <= self._t_end)
+        if in_bounds.any():
+            values[in_bounds] = self._interpolate(timestamps[in_bounds])
+        
+        return values
+    
+    def interpolate_sorted(self, timestamps: np.ndarray) -> np.ndarray:
+        """
+        Get the interpolated values of the signal at the given encoded timestamps, which must be in ascending order.
+        Timestamps outside the bounds of the signal are assigned NaN.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.full(timestamps.shape, np.nan, dtype=self._value_dtype)
+        
+        lo, hi = self._sorted_bounds(timestamps)
+        if lo < hi:
+            values[lo:hi] = self._interpolate_sorted(timestamps[lo:hi])
+        
+        return values
+    
+    def _sorted_bounds(self, timestamps: np.ndarray) -> Tuple[int, int]:
+        """
+        Get the slice [lo, hi) of ascending encoded timestamps that lie within the bounds of the signal.
         """
-        return self._interpolate(tuple(map(self.encode_datetime, time_indices)))
+        return int(np.searchsorted(timestamps, self._t_start, side='left')), int(np.searchsorted(timestamps, self._t_end, side='right'))
     
     @staticmethod
     def encode_datetime(dt: datetime) -> float:
@@ -78,6 +289,17 @@ class EventSignal:
         """
         return dt.timestamp()
     
+    @staticmethod
+    def encode_datetimes(dts: Iterable[datetime]) -> np.ndarray:
+        """
+        Encode datetime objects into a float64 array. NumPy datetime64 arrays are converted in bulk and, like naive
+        datetimes, taken to be in local time.
+        """
+        if isinstance(dts, np.ndarray) and dts.dtype.kind == 'M':
+            return _encode_datetime64(dts)
+        
+        return np.fromiter((dt.timestamp() for dt in dts), dtype=np.float64)
+    
     @staticmethod
     def decode_datetime(ts: float) -> datetime:
         """
@@ -85,32 +307,59 @@ class EventSignal:
         """
         return datetime.fromtimestamp(ts)
     
+    @staticmethod
+    def decode_datetimes(ts: np.ndarray) -> np.ndarray:
+        """
+        Decode a float64 array into an object array of datetimes, as by decode_datetime.
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        days, day_indices = np.unique(np.floor(ts / _SECONDS_PER_DAY), return_inverse=True)
+        
+        # Sampling costs two offset lookups (four conversions) per day; decode sparse samples individually instead
+        if 4 * len(days) >= ts.size:
+            return _decode_each(ts)
+        
+        # Local UTC offsets change at most once a day; sample them at the bounds of each (UTC) day holding samples,
+        # clipped to the samples so that every lookup stays within the representable range
+        t_min, t_max = ts.min(), ts.max()
+        try:
+            day_start_offsets = np.array([_utc_offset(max(day * _SECONDS_PER_DAY, t_min)) for day in days.tolist()])
+            day_end_offsets = np.array([_utc_offset(min((day + 1) * _SECONDS_PER_DAY, t_max)) for day in days.tolist()])
+        except (OverflowError, OSError, ValueError):
+            return _decode_each(ts)
+        
+        # Shift to local time and convert through datetime64 in one pass, rounding microseconds as fromtimestamp does
+        seconds = np.trunc(ts)
+        micros = seconds.astype(np.int64) * 1000000 + np.round((ts - seconds) * 1e6).astype(np.int64)
+        micros += (day_start_offsets[day_indices] * 1e6).astype(np.int64)
+        local = micros.astype('datetime64[us]').astype(object)
+        
+        # Decode individually within days where the offset changes
+        for i in np.flatnonzero((day_start_offsets != day_end_offsets)[day_indices]).tolist():
+            local[i] = datetime.fromtimestamp(ts[i])
+        
+        return local
+    
     @property
     def start(self) -> datetime:
         """
         Get the first datetime of the signal.
         """
-        if self._data is None:
-            return None
-        
-        return self.decode_datetime(self._data[0, 0])
+        return self._start_dt
     
     @property
     def end(self) -> datetime:
         """
         Get the last datetime of the signal.
         """
-        if self._data is None:
-            return None
-        
-        return self.decode_datetime(self._data[0, -1])
+        return self._end_dt
     
     @property
     def duration(self) -> timedelta:
         """
         Get the duration of the signal.
         """
-        if self._data is None:
+        if self._times is None:
             return None
         
         return self.end - self.start
@@ -120,25 +369,54 @@ class EventSignal:
         """
         Get the signal data as datetime-value pairs.
         """
-        if self._data is None:
+        if self._times is None:
+            return None
+        
+        return zip(self.decode_datetimes(self._times), self._values)
+    
+    @property
+    def values_raw(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the signal data as read-only arrays of encoded timestamps and values.
+        """
+        if self._times is None:
             return None
         
-        return zip(map(self.decode_datetime, self._data[0, :]), self._data[1, :])
+        times, values = self._times.view(), self._values.view()
+        times.flags.writeable = False
+        values.flags.writeable = False
+        return times, values
     
     @values.setter
     def values(self, values):
         """
         Set the signal data from datetime-value pairs.
         """
-        self._data = np.array(
-            [(self.encode_datetime(dt), float(val)) for dt, val in values],
-            dtype=np.float64
-        ).T
+        values_list = list(values)
+        
+        # Fill the time and value arrays in a single pass
+        times = np.empty(len(values_list), dtype=np.float64)
+        vals = np.empty(len(values_list), dtype=self._value_dtype)
+        for i, (dt, val) in enumerate(values_list):
+            times[i] = self.encode_datetime(dt)
+            vals[i] = float(val)
+        
+        # Sort the data by time, unless it is already in order (the common case)
+        if np.any(times[1:] < times[:-1]):
+            idx = np.argsort(times, kind='stable')
+            times = times[idx]
+            vals = vals[idx]
+        
+        self._times = times
+        self._values = vals
         
-        # Sort the data by time
-        self._data = self._data[:, self._data[0, :].argsort()]
+        # Cache the encoded and datetime bounds
+        self._t_start = float(self._times[0])
+        self._t_end = float(self._times[-1])
+        self._start_dt = self.decode_datetime(self._t_start)
+        self._end_dt = self.decode_datetime(self._t_end)
         
-        # Set the interpolation kind / function
+        # Set the interpolation kind / function; this also invalidates containing orchestras
         self.interpolation = self._interpolation
 
 